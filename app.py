@@ -1,13 +1,11 @@
 import streamlit as st
-import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 from db.database import init_db
 from core.report_generator import generate_stock_report
-from db.portfolio_manager import portfolio_status, reset_portfolio
+from db.portfolio_manager import portfolio_status_bulk, reset_portfolio
 from db.chat_history import get_chat_history, save_chat, init_chat_history, delete_chat
-from core.llm import memory  # Import the shared memory object
-from config import MEMORY_KEY
 import os
-import subprocess
+import threading
 
 # -----------------------------
 # Init DBs and Session State
@@ -21,29 +19,71 @@ st.title("📈 Quantfolio India - AI Stock Assistant")
 
 # Check if scraped_data folder exists and is not empty
 SCRAPED_DATA_PATH = "scraped_data"
+
+@st.cache_resource
+def bootstrap_scraped_data():
+    # Runs in-process (no interpreter spawn) and at most once per server process.
+    # Raising keeps a failed bootstrap out of the cache, so the next run retries it.
+    from data.data_scraper import scrape_and_save_data, DEFAULT_TICKERS  # Pulls in requests/bs4/yfinance
+    if not scrape_and_save_data(DEFAULT_TICKERS):
+        raise RuntimeError("No company data could be scraped.")
+
+def empty_or_missing(path):
+    # Stops at the first directory entry instead of listing the whole folder
+    try:
+        with os.scandir(path) as entries:
+            return next(entries, None) is None
+    except FileNotFoundError:
+        return True
+
 def ensure_scraped_data():
-    if not os.path.exists(SCRAPED_DATA_PATH) or not os.listdir(SCRAPED_DATA_PATH):
-        st.warning("Scraped data not found or empty. Running data scraper...")
-        subprocess.run(["python3", "data/data_scraper.py"])  # Run the scraper
-        st.success("Data scraping completed. Please rerun the app if needed.")
-        st.stop()
+    if empty_or_missing(SCRAPED_DATA_PATH):
+        with st.status("Scraped data not found or empty. Running data scraper...") as status:
+            try:
+                bootstrap_scraped_data()
+            except Exception as e:
+                status.update(label="Data scraping failed.", state="error")
+                st.error(f"Could not fetch company data: {e} Reload the page to try again.")
+                st.stop()
+            status.update(label="Data scraping completed.", state="complete")
 
 ensure_scraped_data()
 
+@st.cache_resource
+def start_prewarm():
+    # Builds the RAG index, loads the LLM client and primes yfinance for current
+    # holdings in the background, once per server process, so the first query
+    # doesn't pay for all of it
+    def warm():
+        try:
+            from core.report_generator import get_rag
+            import core.llm  # noqa: F401
+            get_rag()
+            portfolio_status_bulk()
+        except Exception as e:
+            print(f"DEBUG: Prewarm failed: {e}")
+    thread = threading.Thread(target=warm, name="prewarm", daemon=True)
+    # get_rag and live_price are Streamlit-cached; without the script context they warn on every call
+    add_script_run_ctx(thread)
+    thread.start()
+
+if os.environ.get("QUANTFOLIO_PREWARM") == "1":
+    start_prewarm()
+
 # Sidebar – show past queries with delete option
 st.sidebar.header("Past Queries")
 history = get_chat_history()
 if history:
-    for h in history:
-        col1, col2 = st.sidebar.columns([4, 1])
-        with col1:
-            st.write("- " + h["query"])
-        with col2:
-            if st.button("❌", key=f"del_{h['id']}"):
-                delete_chat(h["id"])
-                # Clear memory and rerun to avoid state issues
-                memory.clear()
-                st.rerun()
+    # One markdown block and one delete control instead of a widget pair per row
+    st.sidebar.markdown("\n".join("- " + h["query"] for h in history))
+    queries_by_id = {h["id"]: h["query"] for h in history}
+    selected_id = st.sidebar.selectbox("Delete a query", list(queries_by_id), format_func=queries_by_id.get)
+    if st.sidebar.button("❌ Delete selected"):
+        delete_chat(selected_id)
+        # Clear memory and rerun to avoid state issues
+        from core.llm import memory  # Imported here so the sidebar doesn't load LangChain
+        memory.clear()
+        st.rerun()
 else:
     st.sidebar.write("No past queries yet.")
 
@@ -55,8 +95,9 @@ tab1, tab2 = st.tabs(["💬 AI Stock Assistant", "📊 Portfolio Manager"])
 def get_report_and_tickers(query, trade_mode=False):
     return generate_stock_report(query, trade_mode=trade_mode)
 
+@st.cache_data(ttl=5)
 def get_portfolio_status():
-    return portfolio_status()
+    return portfolio_status_bulk()
 
 # -----------------------------
 # Tab 1: AI Assistant
@@ -91,9 +132,8 @@ with tab2:
     st.subheader("Manage Your Portfolio")
 
     # Show portfolio
-    data = get_portfolio_status()
-    if data:
-        df = pd.DataFrame(data, columns=["Stock", "Quantity", "Avg Buy Price", "Live Price", "Unrealized P&L"])
+    df = get_portfolio_status()
+    if not df.empty:
         st.dataframe(df, width='stretch')
     else:
         st.info("No holdings yet. Start trading!")
@@ -102,6 +142,7 @@ with tab2:
     if st.button("🗑️ Reset Portfolio", type="primary"):
         try:
             reset_portfolio()
+            get_portfolio_status.clear()
             st.success("✅ Portfolio reset successfully.")
             st.rerun()
         except Exception as e:
@@ -121,6 +162,7 @@ with tab2:
                 st.success(result)
                 save_chat(trade_query, result)
                 # Clear the cache for portfolio status so it updates immediately
+                get_portfolio_status.clear()
                 st.rerun()
             except Exception as e:
                 st.error(f"Error executing trade: {e}")
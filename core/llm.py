@@ -1,8 +1,12 @@
 # llm.py
 import json
+import os
+import re
+import threading
+from collections import OrderedDict
 from langchain_aws import ChatBedrock
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationBufferWindowMemory
 from config import REGION_NAME, BEDROCK_MODEL, MEMORY_KEY
 
 # Initialize Bedrock LLM
@@ -11,31 +15,184 @@ llm = ChatBedrock(
     region_name=REGION_NAME
 )
 
-# Initialize LangChain memory
-memory = ConversationBufferMemory(
+# Initialize LangChain memory; only the last MEMORY_WINDOW exchanges are replayed,
+# so prompt size stays bounded however long the session runs
+MEMORY_WINDOW = 6
+memory = ConversationBufferWindowMemory(
+    k=MEMORY_WINDOW,
     memory_key=MEMORY_KEY,
     input_key="query",
     return_messages=True
 )
 
-def get_llm_response(prompt: str) -> str:
+# Exact-match cache for ticker-resolution prompts: prompt -> response text, persisted as
+# JSON lines. Only the newest LLM_CACHE_MAX_ENTRIES are kept, in memory and on disk.
+LLM_CACHE_PATH = os.path.join(".cache", "llm_cache.jsonl")
+LLM_CACHE_MAX_ENTRIES = 2048
+_llm_cache_lock = threading.Lock()
+
+def _write_llm_cache(cache: OrderedDict):
+    """Rewrite the on-disk log with just the entries in `cache`."""
+    os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+    tmp_path = LLM_CACHE_PATH + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for prompt, response in cache.items():
+            f.write(json.dumps({"prompt": prompt, "response": response}) + "\n")
+    os.replace(tmp_path, LLM_CACHE_PATH)
+
+def _load_llm_cache():
+    """Load the newest entries from the log, compacting the file if it has grown past them."""
+    cache = OrderedDict()
+    lines = 0
+    try:
+        with open(LLM_CACHE_PATH, 'r', encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    cache[entry["prompt"]] = entry["response"]
+                    cache.move_to_end(entry["prompt"])
+                except (ValueError, KeyError):
+                    continue  # e.g. a line truncated by a crash mid-write
+    except OSError:
+        pass
+    while len(cache) > LLM_CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+    if lines > len(cache):
+        try:
+            _write_llm_cache(cache)
+        except OSError as e:
+            print(f"DEBUG: Could not compact LLM cache: {e}")
+    return cache, len(cache)
+
+_llm_cache, _llm_cache_lines = _load_llm_cache()
+
+def _cache_response(prompt: str, response: str):
+    """Remember a successful response and append it to the on-disk log."""
+    global _llm_cache_lines
+    if not response:
+        return
+    with _llm_cache_lock:
+        _llm_cache[prompt] = response
+        _llm_cache.move_to_end(prompt)
+        while len(_llm_cache) > LLM_CACHE_MAX_ENTRIES:
+            _llm_cache.popitem(last=False)
+        # Compact once the log holds twice the live entries, so it stays bounded too
+        if _llm_cache_lines >= 2 * LLM_CACHE_MAX_ENTRIES:
+            _write_llm_cache(_llm_cache)
+            _llm_cache_lines = len(_llm_cache)
+        else:
+            os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+            with open(LLM_CACHE_PATH, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"prompt": prompt, "response": response}) + "\n")
+            _llm_cache_lines += 1
+
+# Parsed resolve_tickers_with_llm results for queries asked with no conversation history,
+# keyed by the user query (least recently used evicted first). Guarded by _llm_cache_lock.
+RESOLVED_TICKERS_MAX = 1024
+_resolved_tickers = OrderedDict()
+
+def _recall_tickers(query: str):
+    with _llm_cache_lock:
+        tickers = _resolved_tickers.get(query)
+        if tickers is not None:
+            _resolved_tickers.move_to_end(query)
+            return list(tickers)
+    return None
+
+def _remember_tickers(query: str, tickers: list[str]):
+    with _llm_cache_lock:
+        _resolved_tickers[query] = tickers
+        _resolved_tickers.move_to_end(query)
+        if len(_resolved_tickers) > RESOLVED_TICKERS_MAX:
+            _resolved_tickers.popitem(last=False)
+
+def _has_history() -> bool:
+    return bool(memory.load_memory_variables({})[MEMORY_KEY])
+
+# NSE symbols as they appear in the LLM's answer (e.g. TCS.NS, M&M.NS, BAJAJ-AUTO.NS)
+TICKER_RE = re.compile(r'\b([A-Z0-9&-]{1,20}\.NS)\b')
+
+# Local alias table ({ticker: [lowercase names]}) for common NSE companies, so queries
+# that plainly name known companies are resolved without an LLM round-trip
+NSE_SYMBOLS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "nse_symbols.json")
+
+def _load_nse_aliases() -> dict:
+    try:
+        with open(NSE_SYMBOLS_PATH, 'r', encoding='utf-8') as f:
+            symbols = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {alias: ticker for ticker, aliases in symbols.items() for alias in aliases}
+
+_nse_aliases = _load_nse_aliases()
+# Longest alias first, so e.g. "sbi life" wins over "sbi" at the same position
+NSE_ALIAS_RE = re.compile(
+    r"(?<![\w&-])(" + "|".join(re.escape(a) for a in sorted(_nse_aliases, key=len, reverse=True)) + r")(?![\w&-])"
+) if _nse_aliases else None
+# Words a query may contain besides company names and still be resolved locally.
+# Any other word could be part of a company the alias table doesn't know
+# (e.g. "ITC Hotels", "Reliance Capital"), so such queries go to the LLM.
+LOCAL_QUERY_WORDS = frozenset("""
+a about after all also am an analyse analysis analyze and any are as at be been before buy by can cap
+check compare could current currently data day days debt detail details dividend dividends do does doing e
+earnings eps explain financial financials for from fundamental fundamentals fy get give good growth has have
+hold how i in info information invest investing investment is latest limited look looks ltd ltp
+market me my news now nse of on or outlook overview p pb pe performance please price prices profit q1 q2 q3
+q4 qty quantity quarter quarterly ratio ratios report results return returns revenue right roe sales sell
+share shareholding shares should show stock summary target technical technicals tell than the to
+today units valuation versus vs what what's whats will with worth would yoy
+""".split())
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+def _resolve_tickers_locally(query: str) -> list[str]:
+    """
+    Tickers for a query whose words are all either aliases from the table or known
+    query words (LOCAL_QUERY_WORDS, numbers), else []. Anything else is left to the LLM.
+    """
+    if NSE_ALIAS_RE is None:
+        return []
+    text = query.lower()
+    matches = NSE_ALIAS_RE.findall(text)
+    if not matches:
+        return []
+    remainder = WORD_RE.findall(NSE_ALIAS_RE.sub(" ", text))
+    if not all(word.isdigit() or word in LOCAL_QUERY_WORDS for word in remainder):
+        return []
+    return list(dict.fromkeys(_nse_aliases[m] for m in matches))
+
+def get_llm_response(prompt: str, cacheable: bool = False) -> str:
     """
     Send prompt to Bedrock LLM and return ONLY the 'content' string.
+    With cacheable=True and no conversation history yet, identical prompts are
+    answered from the response cache; only use it for prompts whose answer doesn't
+    depend on live data.
     """
     try:
         # Check if we have past messages to include
         history = memory.load_memory_variables({})
         if history[MEMORY_KEY]:
+            # The answer may refer back to the conversation, so it is neither served from nor stored in the cache
+            cacheable = False
             full_prompt = history[MEMORY_KEY] + [HumanMessage(content=prompt)]
         else:
             full_prompt = [HumanMessage(content=prompt)]
 
+        if cacheable:
+            with _llm_cache_lock:
+                cached = _llm_cache.get(prompt)
+            if cached is not None:
+                return cached
+
         response = llm.invoke(full_prompt)
         
         # Save the new interaction to memory
         memory.save_context({"query": prompt}, {"output": response.content})
         
-        return str(response.content).strip()
+        content = str(response.content).strip()
+        if cacheable:
+            _cache_response(prompt, content)
+        return content
     except Exception as e:
         print(f"DEBUG: Error from LLM: {e}")
         return ""
@@ -43,8 +200,22 @@ def get_llm_response(prompt: str) -> str:
 def resolve_tickers_with_llm(query: str) -> list[str]:
     """
     Extract a list of NSE tickers from the LLM output.
+    Queries that only name well-known companies are resolved from the local alias table instead.
     Returns a list of ticker strings (e.g., ['TCS.NS', 'INFY.NS']).
     """
+    local_tickers = _resolve_tickers_locally(query)
+    if local_tickers:
+        print(f"DEBUG: Resolved tickers locally: {local_tickers}")
+        return local_tickers
+
+    # The LLM also sees the conversation so far (e.g. "what about its debt?"), so a
+    # query's resolution is only reusable when there is no history to refer back to
+    cacheable = not _has_history()
+    if cacheable:
+        cached = _recall_tickers(query)
+        if cached is not None:
+            return cached
+
     prompt = f"""
 Identify all NSE stock tickers mentioned in the user's query: "{query}"
 user may ask about multiple stocks or sectors. if asked about a sector, return the top 3 relevant tickers from that sector. or user may give a common name of a company in query like south indian bank, return the correct ticker.
@@ -53,9 +224,19 @@ Each ticker symbol must end with '.NS' and be in uppercase.
 Example response: ["TCS.NS", "RELIANCE.NS"]
 If no valid tickers are found, return an empty list: []
 """
-    raw_response = get_llm_response(prompt)
+    raw_response = get_llm_response(prompt, cacheable=cacheable)
     print(f"DEBUG: Raw LLM ticker response: '{raw_response}'")
 
+    # Fast path: read the symbols straight out of the text, whatever the quoting,
+    # deduplicated in order. JSON parsing is only attempted when this finds nothing.
+    matches = TICKER_RE.findall(raw_response.upper())
+    if matches:
+        valid_tickers = list(dict.fromkeys(matches))
+        print(f"DEBUG: Final resolved tickers: {valid_tickers}")
+        if cacheable:
+            _remember_tickers(query, valid_tickers)
+        return list(valid_tickers)
+
     try:
         # FIX: Replace single quotes with double quotes before parsing
         cleaned_response = raw_response.strip().replace("'", '"')
@@ -67,7 +248,9 @@ If no valid tickers are found, return an empty list: []
         valid_tickers = [t.upper() for t in tickers if isinstance(t, str) and t.endswith(".NS")]
         
         print(f"DEBUG: Final resolved tickers: {valid_tickers}")
-        return valid_tickers
+        if cacheable:
+            _remember_tickers(query, valid_tickers)
+        return list(valid_tickers)
 
     except (json.JSONDecodeError, ValueError) as e:
         print(f"DEBUG: Failed to parse LLM response as JSON: {e}")
@@ -3,13 +3,33 @@ import faiss
 import numpy as np
 import json
 import os
+import sys
 from sentence_transformers import SentenceTransformer
 from typing import Dict, List, Any
 from datetime import datetime
 import hashlib
+import functools
 
 # Load the embedding model
-EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_MODEL = SentenceTransformer(EMBEDDING_MODEL_NAME)
+if EMBEDDING_MODEL.device.type == 'cuda':
+    # fp16 halves encode-time memory traffic on GPU; CPU stays in fp32
+    EMBEDDING_MODEL.half()
+    EMBEDDING_BATCH_SIZE = 256
+else:
+    EMBEDDING_BATCH_SIZE = 128
+
+# Per-file chunk embeddings, keyed by model + chunker version + filename + file content,
+# so restarts and refreshes only encode files that actually changed
+EMBEDDING_CACHE_DIR = os.path.join(".cache", "embeddings")
+# Bump whenever _create_document_chunks changes the chunk texts, to invalidate cached embeddings
+CHUNKER_VERSION = 1
+
+# Below this many chunks an exact flat scan is already fast; above it use HNSW graph search
+# over 8-bit scalar-quantized vectors (a quarter of the float32 memory traffic per distance)
+HNSW_MIN_DOCUMENTS = 512
+HNSW_M = 32
 
 class RAGSystem:
     def __init__(self, data_path: str = "scraped_data", auto_refresh: bool = True):
@@ -18,24 +38,38 @@ class RAGSystem:
         self.documents = []
         self.document_metadata = []  # Store metadata for each document chunk
         self.embeddings = None
+        self._ticker_arr = None  # Ticker of each chunk as an object array, for vectorized filtering
         self.index = None
         self.last_refresh = None
         self.data_hash = None  # Track if data changed
+        self.available_tickers = []  # Sorted tickers in the index, rebuilt on each (re)load
         self._load_and_index_data()
 
-    def _get_data_hash(self) -> str:
-        """Generate hash of all JSON files to detect changes."""
-        if not os.path.exists(self.data_path):
-            return ""
+    def _scan_data_files(self) -> List[os.DirEntry]:
+        """Scraped ticker files, sorted by name, from one directory scan. Backups are skipped."""
+        with os.scandir(self.data_path) as it:
+            return sorted(
+                (entry for entry in it if entry.name.endswith(".json") and "_backup_" not in entry.name),
+                key=lambda entry: entry.name
+            )
+
+    def _get_data_hash(self, entries: List[os.DirEntry] = None) -> str:
+        """
+        Fingerprint the JSON files by name, mtime and size to detect changes.
+        Runs on every query, so it only stats files instead of reading them;
+        the scraper replaces a file whenever its content changes.
+        """
+        if entries is None:
+            if not os.path.exists(self.data_path):
+                return ""
+            entries = self._scan_data_files()
         
-        file_hashes = []
-        for filename in sorted(os.listdir(self.data_path)):
-            if filename.endswith(".json"):
-                file_path = os.path.join(self.data_path, filename)
-                with open(file_path, 'rb') as f:
-                    file_hashes.append(hashlib.md5(f.read()).hexdigest())
+        parts = []
+        for entry in entries:
+            stat = entry.stat()
+            parts.append(f"{entry.name}:{stat.st_mtime_ns}:{stat.st_size}")
         
-        return hashlib.md5(''.join(file_hashes).encode()).hexdigest()
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
 
     def _should_refresh(self) -> bool:
         """Check if data should be refreshed."""
@@ -49,91 +83,66 @@ class RAGSystem:
         """Convert JSON data into semantically meaningful chunks."""
         chunks = []
         company_name = data.get('company_name', ticker)
+        header = f"Company: {company_name} ({ticker})\n"
         
-        # Chunk 1: Company Overview & Key Ratios
-        if data.get('ratios'):
-            ratios_text = f"Company: {company_name} ({ticker})\n"
-            ratios_text += "Key Financial Ratios:\n"
-            
-            for ratio_name, ratio_value in data['ratios'].items():
-                if ratio_value is not None:
-                    ratios_text += f"- {ratio_name}: {ratio_value}\n"
-            
+        def add_chunk(parts: List[str], chunk_type: str):
+            # Each chunk is assembled with one join instead of repeated string +=
             chunks.append({
-                'text': ratios_text,
-                'type': 'ratios',
+                'text': ''.join(parts),
+                'type': chunk_type,
                 'ticker': ticker,
                 'company': company_name
             })
         
+        # Chunk 1: Company Overview & Key Ratios
+        if data.get('ratios'):
+            parts = [header, "Key Financial Ratios:\n"]
+            parts.extend(
+                f"- {ratio_name}: {ratio_value}\n"
+                for ratio_name, ratio_value in data['ratios'].items()
+                if ratio_value is not None
+            )
+            add_chunk(parts, 'ratios')
+        
         # Chunk 2: Financial Performance (Recent years)
         if data.get('profit_loss'):
-            pl_text = f"Company: {company_name} ({ticker})\n"
-            pl_text += "Financial Performance:\n"
-            
+            parts = [header, "Financial Performance:\n"]
             for metric, years_data in data['profit_loss'].items():
                 if isinstance(years_data, dict):
-                    pl_text += f"\n{metric}:\n"
-                    for year, value in years_data.items():
-                        if value is not None:
-                            pl_text += f"  {year}: {value}\n"
-            
-            chunks.append({
-                'text': pl_text,
-                'type': 'financials',
-                'ticker': ticker,
-                'company': company_name
-            })
+                    parts.append(f"\n{metric}:\n")
+                    parts.extend(f"  {year}: {value}\n" for year, value in years_data.items() if value is not None)
+            add_chunk(parts, 'financials')
         
         # Chunk 3: Recent News (if available)
         if data.get('news'):
-            news_text = f"Company: {company_name} ({ticker})\n"
-            news_text += "Recent News:\n"
-            
+            parts = [header, "Recent News:\n"]
             for news_item in data['news'][:5]:  # Limit to 5 most recent
-                title = news_item.get('title', '')
                 date = news_item.get('date', '')
                 description = news_item.get('description', '')
                 
-                news_text += f"\n- {title}"
+                parts.append(f"\n- {news_item.get('title', '')}")
                 if date:
-                    news_text += f" ({date})"
+                    parts.append(f" ({date})")
                 if description:
-                    news_text += f"\n  {description}\n"
-            
-            chunks.append({
-                'text': news_text,
-                'type': 'news',
-                'ticker': ticker,
-                'company': company_name
-            })
+                    parts.append(f"\n  {description}\n")
+            add_chunk(parts, 'news')
         
         # Chunk 4: Corporate Events
         if data.get('events') or data.get('announcements'):
-            events_text = f"Company: {company_name} ({ticker})\n"
-            events_text += "Corporate Events & Announcements:\n"
-            
+            parts = [header, "Corporate Events & Announcements:\n"]
             for event_item in (data.get('events', []) + data.get('announcements', []))[:5]:
-                title = event_item.get('title', '')
                 date = event_item.get('date', '')
                 event_type = event_item.get('type', '')
+                description = event_item.get('description', '')
                 
-                events_text += f"\n- {title}"
+                parts.append(f"\n- {event_item.get('title', '')}")
                 if date:
-                    events_text += f" ({date})"
+                    parts.append(f" ({date})")
                 if event_type:
-                    events_text += f" [Type: {event_type}]"
-                
-                description = event_item.get('description', '')
+                    parts.append(f" [Type: {event_type}]")
                 if description:
-                    events_text += f"\n  {description}\n"
-            
-            chunks.append({
-                'text': events_text,
-                'type': 'events',
-                'ticker': ticker,
-                'company': company_name
-            })
+                    parts.append(f"\n  {description}\n")
+            add_chunk(parts, 'events')
         
         return chunks
 
@@ -145,51 +154,122 @@ class RAGSystem:
 
         self.documents = []
         self.document_metadata = []
+        self.available_tickers = []
         
         print("Loading and indexing scraped data...")
+        file_spans = []  # (cache_key, start, end) of each file's chunks in self.documents
+        
+        entries = self._scan_data_files()
+        # Fingerprint before reading, so a file replaced mid-load still triggers the next refresh
+        data_hash = self._get_data_hash(entries)
         
-        for filename in sorted(os.listdir(self.data_path)):
-            if filename.endswith(".json") and not filename.startswith("_backup"):
-                ticker = filename.replace(".json", "")
-                file_path = os.path.join(self.data_path, filename)
+        for entry in entries:
+            filename = entry.name
+            ticker = filename.replace(".json", "")
+            file_path = entry.path
+            
+            try:
+                with open(file_path, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw)
                 
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    # Create semantic chunks
-                    chunks = self._create_document_chunks(data, ticker)
-                    
-                    for chunk in chunks:
-                        self.documents.append(chunk['text'])
-                        self.document_metadata.append({
-                            'ticker': chunk['ticker'],
-                            'company': chunk['company'],
-                            'type': chunk['type'],
-                            'filename': filename
-                        })
+                # Create semantic chunks
+                chunks = self._create_document_chunks(data, ticker)
+                if chunks:
+                    cache_key = hashlib.md5(f"{EMBEDDING_MODEL_NAME}:{CHUNKER_VERSION}:{filename}:".encode() + raw).hexdigest()
+                    file_spans.append((cache_key, len(self.documents), len(self.documents) + len(chunks)))
                 
-                except Exception as e:
-                    print(f"Error loading {filename}: {e}")
-                    continue
+                for chunk in chunks:
+                    self.documents.append(chunk['text'])
+                    self.document_metadata.append({
+                        'ticker': chunk['ticker'],
+                        'company': chunk['company'],
+                        'type': chunk['type'],
+                        'filename': filename
+                    })
+            
+            except Exception as e:
+                print(f"Error loading {filename}: {e}")
+                continue
 
         if not self.documents:
             print("No documents found in scraped_data.")
             return
 
-        # Generate embeddings
-        print(f"Generating embeddings for {len(self.documents)} document chunks...")
-        self.embeddings = EMBEDDING_MODEL.encode(self.documents, show_progress_bar=True)
-        
-        # Create a FAISS index
-        dimension = self.embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(np.array(self.embeddings).astype('float32'))
+        self.embeddings = self._embed_documents(file_spans)
+        self.index = self._build_index(self.embeddings)
+        self._prune_embedding_cache({cache_key for cache_key, _, _ in file_spans})
         
         self.last_refresh = datetime.now()
-        self.data_hash = self._get_data_hash()
+        self.data_hash = data_hash
+        self._ticker_arr = np.array([m['ticker'] for m in self.document_metadata], dtype=object)
+        self.available_tickers = sorted(set(self._ticker_arr))
         
-        print(f"RAG system initialized with {len(self.documents)} document chunks from {len(set(m['ticker'] for m in self.document_metadata))} companies.")
+        print(f"RAG system initialized with {len(self.documents)} document chunks from {len(self.available_tickers)} companies.")
+
+    def _embed_documents(self, file_spans: List[tuple]) -> np.ndarray:
+        """
+        Embed self.documents file by file. Files whose embeddings are already
+        cached on disk are memory-mapped; the rest are encoded in one batch and cached.
+        """
+        parts = [None] * len(file_spans)
+        missing = []
+        for i, (cache_key, start, end) in enumerate(file_spans):
+            try:
+                cached = np.load(os.path.join(EMBEDDING_CACHE_DIR, f"{cache_key}.npy"), mmap_mode='r')
+                if cached.shape[0] == end - start:
+                    parts[i] = cached
+                    continue
+            except (OSError, ValueError):
+                pass
+            missing.append(i)
+
+        if missing:
+            texts = [doc for i in missing for doc in self.documents[file_spans[i][1]:file_spans[i][2]]]
+            print(f"Generating embeddings for {len(texts)} new or changed document chunks...")
+            # Unit-length embeddings: inner product == cosine similarity
+            encoded = EMBEDDING_MODEL.encode(
+                texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True,
+                show_progress_bar=sys.stdout.isatty()
+            ).astype('float32', copy=False)
+
+            os.makedirs(EMBEDDING_CACHE_DIR, exist_ok=True)
+            offset = 0
+            for i in missing:
+                cache_key, start, end = file_spans[i]
+                parts[i] = encoded[offset:offset + end - start]
+                offset += end - start
+                np.save(os.path.join(EMBEDDING_CACHE_DIR, f"{cache_key}.npy"), parts[i])
+
+        return np.vstack(parts)
+
+    @staticmethod
+    def _prune_embedding_cache(keep: set):
+        """Delete cached embeddings of files that were changed or removed since they were written."""
+        try:
+            entries = list(os.scandir(EMBEDDING_CACHE_DIR))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.endswith(".npy") and entry.name[:-4] not in keep:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    print(f"Could not remove stale embedding cache {entry.name}: {e}")
+
+    @staticmethod
+    def _build_index(embeddings: np.ndarray):
+        """Create a FAISS inner-product index over normalized embeddings."""
+        dimension = embeddings.shape[1]
+        if len(embeddings) < HNSW_MIN_DOCUMENTS:
+            index = faiss.IndexFlatIP(dimension)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+            index.hnsw.efSearch = 64
+            index.train(embeddings)  # Learns per-dimension ranges for the quantizer
+        index.add(embeddings)
+        return index
 
     def refresh_if_needed(self):
         """Refresh the index if data has changed."""
@@ -212,32 +292,65 @@ class RAGSystem:
         if not self.index or len(self.documents) == 0:
             return "No data available. Please ensure data scraping has been completed."
 
-        query_embedding = EMBEDDING_MODEL.encode([query]).astype('float32')
+        query_embedding = self._encode_query(query)
+        return self._retrieve(query, query_embedding, k, filter_ticker)
+
+    def get_contexts(self, query: str, tickers: List[str], k: int = 3) -> Dict[str, str]:
+        """
+        Retrieves context for several tickers, embedding the query only once.
+        Returns a mapping of ticker -> formatted context (same format as get_context).
+        """
+        if self.auto_refresh:
+            self.refresh_if_needed()
         
+        if not self.index or len(self.documents) == 0:
+            return {ticker: "No data available. Please ensure data scraping has been completed." for ticker in tickers}
+
+        query_embedding = self._encode_query(query)
+        return {ticker: self._retrieve(query, query_embedding, k, ticker) for ticker in tickers}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def _encode_query(query: str) -> np.ndarray:
+        """
+        Embed a query the same way documents are embedded (normalized float32, shape (1, dim)).
+        Memoized: a repeated question skips the model forward pass. Callers must not modify the result.
+        """
+        return EMBEDDING_MODEL.encode(
+            [query], convert_to_numpy=True, normalize_embeddings=True
+        ).astype('float32', copy=False)
+
+    def _retrieve(self, query: str, query_embedding: np.ndarray, k: int, filter_ticker: str = None) -> str:
+        """Search the index with a precomputed query embedding and format the results."""
         # Search for more documents initially to allow filtering
         search_k = min(k * 3, len(self.documents))
-        distances, indices = self.index.search(query_embedding, search_k)
+        if filter_ticker:
+            # A ticker owns only a handful of chunks: score exactly those rows instead of
+            # searching the whole index and discarding every other ticker's hits
+            rows = np.flatnonzero(self._ticker_arr == filter_ticker)
+            scores = self.embeddings[rows] @ query_embedding[0]
+            order = np.argsort(-scores)[:search_k]
+            similarities, indices = scores[order][None, :], rows[order][None, :]
+        else:
+            similarities, indices = self.index.search(query_embedding, search_k)
         
         retrieved_chunks = []
         seen_types = set()
         
         for i, idx in enumerate(indices[0]):
-            if idx >= len(self.documents):
+            # HNSW pads with -1 when it finds fewer than search_k neighbours
+            if idx < 0 or idx >= len(self.documents):
                 continue
             
             metadata = self.document_metadata[idx]
             
-            # Filter by ticker if specified
-            if filter_ticker and metadata['ticker'] != filter_ticker:
-                continue
-            
             # Prefer diverse chunk types
             chunk_type = metadata['type']
             if len(retrieved_chunks) < k or chunk_type not in seen_types:
                 retrieved_chunks.append({
                     'text': self.documents[idx],
                     'metadata': metadata,
-                    'similarity_score': distances[0][i]
+                    'similarity_score': similarities[0][i]
                 })
                 seen_types.add(chunk_type)
             
@@ -297,7 +410,7 @@ class RAGSystem:
         if self.auto_refresh:
             self.refresh_if_needed()
         
-        return sorted(set(metadata['ticker'] for metadata in self.document_metadata))
+        return self.available_tickers
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the knowledge base."""
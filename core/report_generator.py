@@ -1,35 +1,47 @@
 # report_generator.py
-import yfinance as yf
-from core.llm import get_llm_response, resolve_tickers_with_llm
-from core.rag_system import RAGSystem
-from db.portfolio_manager import get_live_price, buy_stock, sell_stock, get_historical_price
-from data.data_scraper import scrape_and_save_data
+import re
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
-# Initialize the RAG system globally
-rag_system = RAGSystem()
+# Heavy dependencies (embedding model, yfinance, scraper, Bedrock) are imported
+# inside the functions that need them so importing this module stays cheap.
+
+# Shared across reruns, sessions and script reloads within the process
+@st.cache_resource
+def get_rag():
+    from core.rag_system import RAGSystem
+    return RAGSystem()
+
+@st.cache_resource
+def get_report_cache():
+    from core.semantic_cache import SemanticCache
+    return SemanticCache()
+
 today = date.today()
 
+# Matches 'buy 5 reliance' or 'sell 3 tcs'
+TRADE_RE = re.compile(r"\b(buy|sell)\s+(\d+)\b", re.IGNORECASE)
+
 def generate_stock_report(query, trade_mode=False):
     """
     Generates a financial report based on the query.
     Uses the RAG system to retrieve context from the scraped data.
     """
+    from core.llm import get_llm_response, resolve_tickers_with_llm
+
     # 1. Resolve Tickers
     detected_tickers = resolve_tickers_with_llm(query)
     if not detected_tickers:
         return "I could not identify any valid stock tickers in your query. Please specify a valid NSE stock.", []
 
-    full_ticker = detected_tickers[0]
-    clean_ticker = full_ticker.removesuffix('.NS')
-
     if trade_mode:
+        from db.portfolio_manager import get_live_price, buy_stock, sell_stock
         # Only update DB, do not scrape data
         action, quantity = get_trade_action(query)
         # Always resolve ticker to .NS format
         full_ticker = detected_tickers[0]
-        clean_ticker = full_ticker.removesuffix('.NS')
         price = get_live_price(full_ticker)
         price_str = f"{price:.2f}" if price is not None else "N/A"
         if action == "buy":
@@ -44,34 +56,53 @@ def generate_stock_report(query, trade_mode=False):
         else:
             return "I could not understand the trade command.", []
     else:
-        # Scrape data for all tickers that are not available
-        missing_clean_tickers = []
-        for full_ticker in detected_tickers:
-            clean_ticker = full_ticker.removesuffix('.NS')
-            if clean_ticker not in rag_system.get_available_tickers():
-                missing_clean_tickers.append(clean_ticker)
-        if missing_clean_tickers:
-            with st.spinner(f"Scraping new data for: {', '.join(missing_clean_tickers)}..."):
-                scrape_and_save_data(missing_clean_tickers)
-            st.rerun()
-        # Retrieve context for all tickers
-        all_context = ""
-        all_yfinance = ""
-        for full_ticker in detected_tickers:
-            clean_ticker = full_ticker.removesuffix('.NS')
-            context = rag_system.get_context(query, k=3, filter_ticker=clean_ticker)
+        # Repeated and near-duplicate queries only count when they were about the same tickers
+        report_cache = get_report_cache()
+        cached = report_cache.lookup(query, detected_tickers)
+        if cached:
+            return cached
+        from db.portfolio_manager import get_live_prices
+        from data.data_scraper import scrape_and_save_data
+        rag_system = get_rag()
+        # (full, clean) ticker pairs, e.g. ('TCS.NS', 'TCS')
+        ticker_pairs = [(t, t.removesuffix('.NS')) for t in detected_tickers]
+        # Live prices (Yahoo) don't depend on the scraped data, so fetch them for all
+        # tickers in the background (with this run's script context, for the cached
+        # price lookups) while scraping and retrieval run
+        ctx = get_script_run_ctx(suppress_warning=True)
+        with ThreadPoolExecutor(max_workers=1, initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+            prices_future = executor.submit(get_live_prices, detected_tickers)
+            # Scrape data for all tickers that are not available
+            available = set(rag_system.get_available_tickers())
+            missing_clean_tickers = [clean for _, clean in ticker_pairs if clean not in available]
+            if missing_clean_tickers:
+                with st.spinner(f"Scraping new data for: {', '.join(missing_clean_tickers)}..."):
+                    scraped = scrape_and_save_data(missing_clean_tickers)
+                # Index the new files in place rather than rerunning the whole script; the
+                # mtime/size fingerprint skips the rebuild when nothing was actually written
+                if scraped:
+                    rag_system.refresh_if_needed()
+            # Retrieve context for all tickers
+            contexts = rag_system.get_contexts(query, [clean for _, clean in ticker_pairs], k=3)
+            prices = prices_future.result()
+        context_parts = []
+        yfinance_parts = []
+        for full_ticker, clean_ticker in ticker_pairs:
+            context = contexts[clean_ticker]
             if not context:
                 context = f"No specific data available from screener.in for {clean_ticker}."
             try:
-                live_price = get_live_price(full_ticker)
-                if live_price:
-                    yfinance_context = f"Live Price of {full_ticker}: {live_price:.2f}"
+                price = prices[full_ticker]
+                if price:
+                    yfinance_context = f"Live Price of {full_ticker}: {price:.2f}"
                 else:
                     yfinance_context = f"Could not fetch live price for {full_ticker} from yfinance."
             except Exception:
                 yfinance_context = "Could not fetch live data."
-            all_context += f"\n--- {clean_ticker} ---\n{context}\n"
-            all_yfinance += f"\n--- {clean_ticker} ---\n{yfinance_context}\n"
+            context_parts.append(f"\n--- {clean_ticker} ---\n{context}\n")
+            yfinance_parts.append(f"\n--- {clean_ticker} ---\n{yfinance_context}\n")
+        all_context = "".join(context_parts)
+        all_yfinance = "".join(yfinance_parts)
         # Combine context and get LLM response
         prompt = f"""
 You are an expert financial analyst. Your task is to provide a concise, point-wise analysis of stocks based on the user's query and the provided context
@@ -118,18 +149,12 @@ Be brief and direct, adhering to the specified format.
 {query}
 """
         llm_response = get_llm_response(prompt)
+        if llm_response:
+            report_cache.add(query, llm_response, detected_tickers)
         return llm_response, detected_tickers
 
 def get_trade_action(query):
-    import re
-    query_lower = query.lower()
-    # Match 'buy 5 reliance' or 'sell 3 tcs'
-    buy_match = re.search(r"buy\s+(\d+)", query_lower)
-    sell_match = re.search(r"sell\s+(\d+)", query_lower)
-    if buy_match:
-        quantity = int(buy_match.group(1))
-        return "buy", quantity
-    elif sell_match:
-        quantity = int(sell_match.group(1))
-        return "sell", quantity
-    return None, None
\ No newline at end of file
+    match = TRADE_RE.search(query)
+    if match:
+        return match.group(1).lower(), int(match.group(2))
+    return None, None
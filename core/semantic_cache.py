@@ -0,0 +1,121 @@
+# semantic_cache.py
+import json
+import re
+import threading
+import time
+import faiss
+import numpy as np
+from typing import List, Optional, Tuple
+from core.rag_system import EMBEDDING_MODEL, RAGSystem
+from db.database import get_connection, write_lock
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Expired entries are dropped from memory and SQLite once at least this many have piled up
+PRUNE_MIN_EXPIRED = 32
+
+class SemanticCache:
+    """
+    Caches generated reports keyed by the embedding of the user query.
+    A new query about the same tickers whose cosine similarity to a cached one
+    exceeds `threshold` gets the cached report back instead of a fresh Bedrock call.
+    Reports quote live prices, so entries are only served for `ttl` seconds.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: int = 3600):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.responses = []  # (response, tickers, created_at), parallel to the vectors in self.index
+        self.exact = {}  # Normalized query -> position in self.responses
+        self.index = faiss.IndexFlatIP(EMBEDDING_MODEL.get_sentence_embedding_dimension())
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return WHITESPACE_RE.sub(" ", query.strip().lower())
+
+    def _fresh(self, position: int) -> bool:
+        return time.time() - self.responses[position][2] < self.ttl
+
+    def _load(self):
+        """Create the backing table, drop expired reports and load the rest into the index."""
+        with write_lock, get_connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS report_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT,
+                tickers TEXT,
+                embedding BLOB,
+                response TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            conn.execute("DELETE FROM report_cache WHERE timestamp < datetime('now', ?)", (f"-{self.ttl} seconds",))
+        rows = get_connection().execute(
+            "SELECT query, embedding, response, tickers, strftime('%s', timestamp) FROM report_cache ORDER BY id ASC"
+        ).fetchall()
+        if rows:
+            vectors = np.vstack([np.frombuffer(row[1], dtype='float32') for row in rows])
+            self.index.add(vectors)
+            self.responses = [(row[2], json.loads(row[3]), float(row[4])) for row in rows]
+            self.exact = {self._normalize(row[0]): i for i, row in enumerate(rows)}
+
+    def lookup(self, query: str, tickers: List[str]) -> Optional[Tuple[str, List[str]]]:
+        """
+        Return (response, tickers) for a fresh repeat or near-duplicate query about the
+        same tickers, or None. Queries that differ only in the company name embed very
+        closely, and follow-ups like "analyse its results" repeat verbatim for different
+        companies, so the query text is never enough on its own.
+        """
+        wanted = set(tickers)
+        with self._lock:
+            # Same question modulo case/whitespace: no embedding needed
+            position = self.exact.get(self._normalize(query))
+            if position is not None and self._fresh(position) and set(self.responses[position][1]) == wanted:
+                return self.responses[position][:2]
+            if self.index.ntotal == 0:
+                return None
+            # A few neighbours, so an expired or other-company best match doesn't hide a usable one
+            # Same memoized encoder as retrieval, so the report path embeds the query once
+            similarities, indices = self.index.search(RAGSystem._encode_query(query), min(self.index.ntotal, 5))
+            for similarity, position in zip(similarities[0], indices[0]):
+                if similarity < self.threshold:
+                    break
+                response, cached_tickers, _ = self.responses[position]
+                if self._fresh(position) and set(cached_tickers) == wanted:
+                    return response, cached_tickers
+        return None
+
+    def add(self, query: str, response: str, tickers: List[str]):
+        """Store a generated report for future lookups."""
+        vector = RAGSystem._encode_query(query)
+        with write_lock, get_connection() as conn:
+            conn.execute(
+                "INSERT INTO report_cache (query, tickers, embedding, response) VALUES (?, ?, ?, ?)",
+                (query, json.dumps(tickers), vector.tobytes(), response)
+            )
+        with self._lock:
+            self.index.add(vector)
+            self.responses.append((response, tickers, time.time()))
+            self.exact[self._normalize(query)] = len(self.responses) - 1
+            pruned = self._prune_expired()
+        if pruned:
+            with write_lock, get_connection() as conn:
+                conn.execute("DELETE FROM report_cache WHERE timestamp < datetime('now', ?)", (f"-{self.ttl} seconds",))
+
+    def _prune_expired(self) -> int:
+        """
+        Drop the expired prefix of the cache (entries are in insertion order) once it
+        reaches PRUNE_MIN_EXPIRED. Caller must hold self._lock. Returns the number dropped.
+        """
+        expired = 0
+        while expired < len(self.responses) and not self._fresh(expired):
+            expired += 1
+        if expired < PRUNE_MIN_EXPIRED:
+            return 0
+        # IndexFlat renumbers the remaining vectors from 0, keeping them parallel to self.responses
+        self.index.remove_ids(faiss.IDSelectorRange(0, expired))
+        del self.responses[:expired]
+        self.exact = {q: p - expired for q, p in self.exact.items() if p >= expired}
+        return expired
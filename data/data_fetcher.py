@@ -1,9 +1,73 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
+import functools
+import json
+import os
+import time
 
+# numba is optional: without it the kernel below runs as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+CACHE_DIR = ".cache"
+FUNDAMENTALS_TTL = 24 * 60 * 60
+TECHNICALS_TTL = 60 * 60
+
+# One yf.Ticker per symbol for the life of the process, so repeat lookups reuse
+# its HTTP session and cookie/crumb state instead of redoing that setup
+_tickers = {}
+
+def get_ticker(symbol: str) -> yf.Ticker:
+    if symbol not in _tickers:
+        _tickers[symbol] = yf.Ticker(symbol)
+    return _tickers[symbol]
+
+# stock.info is a full quoteSummary download on every access; keep each result briefly
+INFO_TTL = 60
+_info_cache = {}
+
+def get_info(symbol: str) -> dict:
+    """The symbol's .info dict, fetched at most once per INFO_TTL seconds."""
+    cached = _info_cache.get(symbol)
+    if cached and time.monotonic() - cached[0] < INFO_TTL:
+        return cached[1]
+    info = get_ticker(symbol).info
+    _info_cache[symbol] = (time.monotonic(), info)
+    return info
+
+def disk_cached(endpoint: str, ttl: int):
+    """
+    Cache a per-ticker fetch as JSON under .cache/{ticker}_{endpoint}.json.
+    An entry is fresh while its file mtime is younger than `ttl` seconds.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(ticker: str):
+            path = os.path.join(CACHE_DIR, f"{ticker}_{endpoint}.json")
+            try:
+                if time.time() - os.path.getmtime(path) < ttl:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        return json.load(f)
+            except (OSError, ValueError):
+                pass
+
+            result = func(ticker)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+            return result
+        return wrapper
+    return decorator
+
+@disk_cached("fundamentals", FUNDAMENTALS_TTL)
 def get_fundamentals(ticker: str):
-    stock = yf.Ticker(ticker)
-    info = stock.info
+    info = get_info(ticker)
 
     return {
         "PE": info.get("trailingPE"),
@@ -14,26 +78,60 @@ def get_fundamentals(ticker: str):
         "MarketCap": info.get("marketCap"),
     }
 
-def get_technicals(ticker: str):
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="6mo")
+@njit(cache=True)
+def _rsi_ma_last(close, period=14, ma1=50, ma2=200):
+    """
+    Latest Wilder RSI and the two simple moving averages of `close`, computed
+    in a single forward pass. Values without enough history are NaN.
+    """
+    n = close.shape[0]
+    alpha = 1.0 / period
+    avg_gain = 0.0
+    avg_loss = 0.0
+    sum1 = 0.0
+    sum2 = 0.0
+    for i in range(n):
+        sum1 += close[i]
+        sum2 += close[i]
+        if i >= ma1:
+            sum1 -= close[i - ma1]
+        if i >= ma2:
+            sum2 -= close[i - ma2]
+        if i == 0:
+            continue
 
-    # Moving averages
-    hist["50DMA"] = hist["Close"].rolling(50).mean()
-    hist["200DMA"] = hist["Close"].rolling(200).mean()
+        delta = close[i] - close[i - 1]
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if i == 1:
+            avg_gain = gain
+            avg_loss = loss
+        else:
+            avg_gain += alpha * (gain - avg_gain)
+            avg_loss += alpha * (loss - avg_loss)
 
-    # Simple RSI
-    delta = hist["Close"].diff()
-    gain = delta.clip(lower=0).rolling(14).mean()
-    loss = -delta.clip(upper=0).rolling(14).mean()
-    rs = gain / loss
-    hist["RSI"] = 100 - (100 / (1 + rs))
+    if n <= period:
+        rsi = np.nan
+    elif avg_loss == 0.0:
+        rsi = 100.0 if avg_gain > 0.0 else np.nan
+    else:
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    ma1_last = sum1 / ma1 if n >= ma1 else np.nan
+    ma2_last = sum2 / ma2 if n >= ma2 else np.nan
+    return rsi, ma1_last, ma2_last
+
+@disk_cached("technicals", TECHNICALS_TTL)
+def get_technicals(ticker: str):
+    stock = get_ticker(ticker)
+    hist = stock.history(period="6mo")
+    close = hist["Close"].to_numpy(dtype=np.float64)
 
-    latest = hist.iloc[-1]
+    # Wilder RSI (RMA of gains/losses, alpha = 1/14) plus 50/200-day moving averages
+    rsi, ma50, ma200 = _rsi_ma_last(close)
 
     return {
-        "RSI": round(latest["RSI"], 2),
-        "50DMA": round(latest["50DMA"], 2),
-        "200DMA": round(latest["200DMA"], 2),
-        "LastPrice": round(latest["Close"], 2)
+        "RSI": round(float(rsi), 2),
+        "50DMA": round(float(ma50), 2),
+        "200DMA": round(float(ma200), 2),
+        "LastPrice": round(float(close[-1]), 2)
     }
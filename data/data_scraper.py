@@ -1,11 +1,20 @@
 # data_scraper.py
 import requests
 from bs4 import BeautifulSoup
+import soupsieve as sv
 import json
+import orjson
 import os
 import time
 import logging
 import re
+import threading
+import functools
+import sys
+import hashlib
+import glob
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional, Union
 from requests.adapters import HTTPAdapter
 try:
@@ -13,6 +22,7 @@ try:
 except ModuleNotFoundError:
     from data_fetcher import get_fundamentals, get_technicals
 from requests.packages.urllib3.util.retry import Retry
+from requests.packages.urllib3.util import make_headers
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,34 +32,182 @@ logger = logging.getLogger(__name__)
 if not os.path.exists("scraped_data"):
     os.makedirs("scraped_data")
 
+# Tickers scraped when the app starts with no scraped data
+DEFAULT_TICKERS = ["RELIANCE"]
+
 # Headers to mimic a browser
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.5',
-    'Accept-Encoding': 'gzip, deflate',
+    # gzip/deflate plus br/zstd when brotli/zstandard are installed, so we never
+    # advertise an encoding urllib3 can't decode
+    'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
     'Connection': 'keep-alive',
     'Upgrade-Insecure-Requests': '1'
 }
 
+# Precompiled patterns used while parsing every page
+DATE_INLINE_RE = re.compile(r'\b\d{1,2}[\s\-/]\w{3,9}[\s\-/]\d{2,4}\b')
+SCREENER_SUFFIX_RE = re.compile(r'\s*\|\s*Screener.*$', re.IGNORECASE)
+STOCK_SUFFIX_RE = re.compile(r'\s*-\s*Stock.*$', re.IGNORECASE)
+# Substring match, so 'results' and 'dividends' count too
+EVENT_KEYWORDS_RE = re.compile(r'dividend|agm|egm|result|earnings|meeting', re.IGNORECASE)
+
+# Precompiled CSS selectors, reused for every page and every list item
+# Multiple possible selectors for ratio tables/sections
+RATIO_SECTIONS_SEL = sv.compile(', '.join([
+    '.company-ratios',
+    '.ratios',
+    '.key-ratios',
+    '.financial-ratios',
+    '[data-ratios]',
+    '.ratio-table'
+]))
+RATIO_NAME_SEL = sv.compile('.name, .ratio-name, [data-name]')
+RATIO_VALUE_SEL = sv.compile('.value, .ratio-value, [data-value]')
+
+# News section selectors
+NEWS_SECTIONS_SEL = sv.compile(', '.join([
+    '.news-section',
+    '.company-news',
+    '#news',
+    '[data-section="news"]',
+    '.news-container',
+    '.recent-news',
+    '.news-items'
+]))
+# Item structures tried in order until one matches
+NEWS_ITEM_SELS = (
+    sv.compile('.news-item, .news, .article, li, .row'),
+    sv.compile('div[class*="news"]'),
+    sv.compile('p, div')
+)
+NEWS_TITLE_SEL = sv.compile('.title, .headline, .news-title, h3, h4, h5, strong, a')
+NEWS_DATE_SEL = sv.compile('.date, .news-date, .timestamp, time, [data-date]')
+NEWS_DESC_SEL = sv.compile('.description, .summary, .excerpt, p')
+LINK_SEL = sv.compile('a')
+
+# Event section selectors
+EVENT_SECTIONS_SEL = sv.compile(', '.join([
+    '.events-section',
+    '.company-events',
+    '#events',
+    '[data-section="events"]',
+    '.events-container',
+    '.corporate-events',
+    '.event-items',
+    '.announcements'
+]))
+EVENT_ITEM_SELS = (
+    sv.compile('.event-item, .event, .announcement, li, .row'),
+    sv.compile('div[class*="event"], div[class*="announcement"]'),
+    sv.compile('p, div')
+)
+EVENT_TITLE_SEL = sv.compile('.title, .event-title, .announcement-title, h3, h4, h5, strong')
+EVENT_DATE_SEL = sv.compile('.date, .event-date, .announcement-date, time, [data-date]')
+EVENT_TYPE_SEL = sv.compile('.type, .category, .event-type')
+EVENT_DESC_SEL = sv.compile('.description, .details, p')
+
+# lxml's C parser is several times faster than html.parser on screener's large pages;
+# fall back to the stdlib parser where lxml isn't installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
 # Setup session with retry strategy
 session = requests.Session()
+# Browser headers (incl. gzip/deflate/br Accept-Encoding) are set once on the session
+session.headers.update(HEADERS)
 retry_strategy = Retry(
     total=3,
     backoff_factor=2,
     status_forcelist=[429, 500, 502, 503, 504, 520, 521, 522, 523, 524]
 )
-adapter = HTTPAdapter(max_retries=retry_strategy)
+# Every request goes to one host; keep enough warm keep-alive connections for all workers
+adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=1, pool_maxsize=16)
 session.mount("http://", adapter)
 session.mount("https://", adapter)
 
+# Tickers are scraped concurrently, but requests to screener.in are still
+# spaced out by a shared throttle to stay polite
+MAX_CONCURRENT_SCRAPES = 4
+MIN_REQUEST_INTERVAL = 0.5  # seconds between any two requests
+_throttle_lock = threading.Lock()
+_next_request_at = 0.0
+
+def _throttle():
+    """Block until this thread may send its next request."""
+    global _next_request_at
+    with _throttle_lock:
+        now = time.monotonic()
+        wait = _next_request_at - now
+        _next_request_at = max(now, _next_request_at) + MIN_REQUEST_INTERVAL
+    if wait > 0:
+        time.sleep(wait)
+
+# (connect, read) timeouts: unreachable URLs fail fast, page reads get longer
+REQUEST_TIMEOUT = (5, 30)
+# Pages larger than this are not downloaded
+MAX_PAGE_BYTES = 10 * 1024 * 1024
+PAGE_CHUNK_BYTES = 64 * 1024
+
+def _read_capped(response: requests.Response) -> Optional[bytes]:
+    """
+    Read a streamed response body, giving up once it exceeds MAX_PAGE_BYTES.
+    Chunked or compressed pages carry no usable Content-Length, so the cap is
+    enforced on the (decoded) bytes actually received. Returns None if too large.
+    """
+    body = bytearray()
+    for chunk in response.iter_content(chunk_size=PAGE_CHUNK_BYTES):
+        body += chunk
+        if len(body) > MAX_PAGE_BYTES:
+            response.close()
+            return None
+    return bytes(body)
+
+# Resolved screener.in URL per ticker, so warm runs skip URL-pattern probing
+URL_CACHE_PATH = os.path.join(".cache", "screener_urls.json")
+_url_cache_lock = threading.Lock()
+
+def _load_url_cache() -> Dict[str, str]:
+    try:
+        with open(URL_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_url_cache = _load_url_cache()
+
+def _remember_url(ticker: str, url: str):
+    """Record the URL that served a ticker's page and persist the cache."""
+    with _url_cache_lock:
+        if _url_cache.get(ticker) == url:
+            return
+        _url_cache[ticker] = url
+        os.makedirs(os.path.dirname(URL_CACHE_PATH), exist_ok=True)
+        with open(URL_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(_url_cache, f, indent=4)
+
+# Currency suffix multipliers; 'Cr' is the only two-character suffix
+FINANCIAL_MULTIPLIERS = {'Cr': 10000000, 'L': 100000, 'K': 1000, 'M': 1000000, 'B': 1000000000}
+# Thousands separators and whitespace, removed in one str.translate pass
+FINANCIAL_STRIP_TABLE = str.maketrans('', '', ', \t\n\r\xa0')
+EMPTY_FINANCIAL_VALUES = frozenset(['', '-', 'N/A', 'NA', 'n.a.', '--'])
+
+# Cell values repeat heavily across tables ('0', '-', common percentages), so memoize
+@functools.lru_cache(maxsize=8192)
 def clean_financial_value(value: str) -> Union[float, str]:
     """Convert financial string values to numbers where possible."""
-    if not value or value.strip() in ['', '-', 'N/A', 'NA', 'n.a.', '--']:
+    if not value:
         return None
     
-    # Remove commas and extra spaces
-    cleaned = value.strip().replace(',', '')
+    # Remove commas and spaces
+    cleaned = value.translate(FINANCIAL_STRIP_TABLE)
+    if cleaned in EMPTY_FINANCIAL_VALUES:
+        return None
     
     # Handle percentage values
     if '%' in cleaned:
@@ -58,16 +216,13 @@ def clean_financial_value(value: str) -> Union[float, str]:
         except ValueError:
             return value
     
-    # Handle currency values (Cr, L, etc.)
-    multipliers = {'Cr': 10000000, 'L': 100000, 'K': 1000, 'M': 1000000, 'B': 1000000000}
-    
-    for suffix, multiplier in multipliers.items():
-        if cleaned.endswith(suffix):
-            try:
-                num_part = cleaned[:-len(suffix)].strip()
-                return float(num_part) * multiplier
-            except ValueError:
-                continue
+    # Handle currency values (Cr, L, etc.) with a dict lookup on the last 1-2 chars
+    suffix = cleaned[-2:] if cleaned[-2:] in FINANCIAL_MULTIPLIERS else cleaned[-1:]
+    if suffix in FINANCIAL_MULTIPLIERS:
+        try:
+            return float(cleaned[:-len(suffix)]) * FINANCIAL_MULTIPLIERS[suffix]
+        except ValueError:
+            pass
     
     # Try to convert to float directly
     try:
@@ -92,8 +247,8 @@ def extract_company_name(soup: BeautifulSoup, ticker: str) -> str:
             if element and element.get_text(strip=True):
                 name = element.get_text(strip=True)
                 # Clean up common suffixes
-                name = re.sub(r'\s*\|\s*Screener.*$', '', name, flags=re.IGNORECASE)
-                name = re.sub(r'\s*-\s*Stock.*$', '', name, flags=re.IGNORECASE)
+                name = SCREENER_SUFFIX_RE.sub('', name)
+                name = STOCK_SUFFIX_RE.sub('', name)
                 if name and len(name) > 2:
                     return name
         except Exception as e:
@@ -106,29 +261,16 @@ def extract_key_ratios(soup: BeautifulSoup) -> Dict[str, Any]:
     """Dynamically extract key financial ratios from various table structures."""
     ratios = {}
     
-    # Multiple possible selectors for ratio tables/sections
-    ratio_selectors = [
-        '.company-ratios',
-        '.ratios',
-        '.key-ratios',
-        '.financial-ratios',
-        '[data-ratios]',
-        '.ratio-table'
-    ]
-    
-    for selector in ratio_selectors:
+    # One traversal for all candidate sections (document order) instead of one per selector
+    for ratios_section in RATIO_SECTIONS_SEL.select(soup):
         try:
-            ratios_section = soup.select_one(selector)
-            if not ratios_section:
-                continue
-            
             # Try different structures within the ratios section
             # Structure 1: List items with name/value spans
             ratio_items = ratios_section.select('li')
             if ratio_items:
                 for item in ratio_items:
-                    name_elem = item.select_one('.name, .ratio-name, [data-name]')
-                    value_elem = item.select_one('.value, .ratio-value, [data-value]')
+                    name_elem = RATIO_NAME_SEL.select_one(item)
+                    value_elem = RATIO_VALUE_SEL.select_one(item)
                     
                     if name_elem and value_elem:
                         name = name_elem.get_text(strip=True)
@@ -168,13 +310,18 @@ def extract_key_ratios(soup: BeautifulSoup) -> Dict[str, Any]:
                     return ratios
         
         except Exception as e:
-            logger.debug(f"Failed to extract ratios with selector {selector}: {e}")
+            logger.debug(f"Failed to extract ratios from a candidate section: {e}")
             continue
     
     return ratios
 
-def extract_financial_table(soup: BeautifulSoup, table_type: str) -> Dict[str, Any]:
-    """Dynamically extract financial tables (P&L, Balance Sheet, Cash Flow)."""
+def extract_financial_table(soup: BeautifulSoup, table_type: str,
+                            sections_by_id: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Dynamically extract financial tables (P&L, Balance Sheet, Cash Flow).
+    If a prebuilt id -> element index is given, the section with id == table_type
+    is tried before walking the document with the fallback selectors.
+    """
     table_data = {}
     
     # Dynamic selectors based on table type
@@ -196,12 +343,14 @@ def extract_financial_table(soup: BeautifulSoup, table_type: str) -> Dict[str, A
             '[data-table="profit-loss"]'
         ])
     
-    for selector in selectors:
+    def candidate_sections():
+        if sections_by_id and table_type in sections_by_id:
+            yield sections_by_id[table_type]
+        # One traversal for all candidate sections (document order) instead of one per selector
+        yield from soup.select(', '.join(selectors))
+    
+    for section in candidate_sections():
         try:
-            section = soup.select_one(selector)
-            if not section:
-                continue
-            
             # Find table within the section
             table = section.select_one('table')
             if not table:
@@ -212,7 +361,8 @@ def extract_financial_table(soup: BeautifulSoup, table_type: str) -> Dict[str, A
             header_row = table.select_one('thead tr, tr:first-child')
             if header_row:
                 header_cells = header_row.select('th, td')
-                headers = [cell.get_text(strip=True) for cell in header_cells]
+                # Interned: the same period labels recur in every table of every ticker
+                headers = [sys.intern(cell.get_text(strip=True)) for cell in header_cells]
                 
                 # Skip first column if it's likely a row label
                 if len(headers) > 1 and (not headers[0] or len(headers[0]) < 3):
@@ -237,6 +387,7 @@ def extract_financial_table(soup: BeautifulSoup, table_type: str) -> Dict[str, A
                 metric_name = row_data[0]
                 if not metric_name or len(metric_name) < 2:
                     continue
+                metric_name = sys.intern(metric_name)
                 
                 # Remaining cells are values
                 values = row_data[1:len(headers)+1]  # Ensure we don't exceed header count
@@ -256,7 +407,7 @@ def extract_financial_table(soup: BeautifulSoup, table_type: str) -> Dict[str, A
                 return table_data
         
         except Exception as e:
-            logger.debug(f"Failed to extract table {table_type} with selector {selector}: {e}")
+            logger.debug(f"Failed to extract table {table_type} from a candidate section: {e}")
             continue
     
     logger.warning(f"Could not find or parse {table_type} table")
@@ -267,94 +418,57 @@ def parse_date(date_str: str) -> Optional[str]:
     if not date_str:
         return None
     
-    # Clean the date string
-    date_str = date_str.strip()
-    
-    # Common date patterns on Screener
-    date_patterns = [
-        r'(\d{1,2})\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+(\d{4})',
-        r'(\d{1,2})-(\d{1,2})-(\d{4})',
-        r'(\d{4})-(\d{1,2})-(\d{1,2})',
-        r'(\d{1,2})/(\d{1,2})/(\d{4})'
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, date_str, re.IGNORECASE)
-        if match:
-            return date_str  # Return original format for now
-    
-    return date_str
+    # Dates are kept in their original format for now, so cleaning is all that's needed
+    return date_str.strip()
 
 def extract_news_and_events(soup: BeautifulSoup) -> Dict[str, List[Dict[str, Any]]]:
     """Extract recent news and corporate events from the company page."""
     news_data = {"news": [], "events": [], "announcements": []}
-    
-    # News section selectors
-    news_selectors = [
-        '.news-section',
-        '.company-news',
-        '#news',
-        '[data-section="news"]',
-        '.news-container',
-        '.recent-news',
-        '.news-items'
-    ]
-    
-    # Event section selectors  
-    event_selectors = [
-        '.events-section',
-        '.company-events',
-        '#events',
-        '[data-section="events"]',
-        '.events-container',
-        '.corporate-events',
-        '.event-items',
-        '.announcements'
-    ]
+    # Titles already collected per category; items are deduplicated and capped as they are parsed
+    seen_titles = {category: set() for category in news_data}
+    max_items = 20
     
     # Extract News
-    for selector in news_selectors:
+    for news_section in NEWS_SECTIONS_SEL.select(soup):
         try:
-            news_section = soup.select_one(selector)
-            if not news_section:
-                continue
-            
             # Try different news item structures
             news_items = (
-                news_section.select('.news-item, .news, .article, li, .row') or
-                news_section.select('div[class*="news"]') or
-                news_section.select('p, div')
+                NEWS_ITEM_SELS[0].select(news_section) or
+                NEWS_ITEM_SELS[1].select(news_section) or
+                NEWS_ITEM_SELS[2].select(news_section)
             )
             
             for item in news_items:
+                if len(seen_titles['news']) >= max_items:
+                    break
                 news_item = {}
                 
                 # Extract title/headline
                 title_elem = (
-                    item.select_one('.title, .headline, .news-title, h3, h4, h5, strong, a') or
+                    NEWS_TITLE_SEL.select_one(item) or
                     item
                 )
                 
                 if title_elem:
                     title = title_elem.get_text(strip=True)
-                    if len(title) < 10:  # Skip very short titles
+                    if len(title) < 10 or title in seen_titles['news']:  # Skip very short or duplicate titles
                         continue
                     news_item['title'] = title
                 
                 # Extract date
-                date_elem = item.select_one('.date, .news-date, .timestamp, time, [data-date]')
+                date_elem = NEWS_DATE_SEL.select_one(item)
                 if date_elem:
                     date_text = date_elem.get_text(strip=True)
                     news_item['date'] = parse_date(date_text)
                 else:
                     # Try to extract date from the full text
                     full_text = item.get_text()
-                    date_match = re.search(r'\b\d{1,2}[\s\-/]\w{3,9}[\s\-/]\d{2,4}\b', full_text)
+                    date_match = DATE_INLINE_RE.search(full_text)
                     if date_match:
                         news_item['date'] = parse_date(date_match.group())
                 
                 # Extract link
-                link_elem = item.select_one('a')
+                link_elem = LINK_SEL.select_one(item)
                 if link_elem and link_elem.get('href'):
                     href = link_elem.get('href')
                     if href.startswith('/'):
@@ -362,13 +476,14 @@ def extract_news_and_events(soup: BeautifulSoup) -> Dict[str, List[Dict[str, Any
                     news_item['link'] = href
                 
                 # Extract description/summary
-                desc_elem = item.select_one('.description, .summary, .excerpt, p')
+                desc_elem = NEWS_DESC_SEL.select_one(item)
                 if desc_elem and desc_elem != title_elem:
                     description = desc_elem.get_text(strip=True)
                     if description and description != news_item.get('title'):
                         news_item['description'] = description[:500]  # Limit length
                 
                 if news_item and 'title' in news_item:
+                    seen_titles['news'].add(news_item['title'])
                     news_data['news'].append(news_item)
             
             if news_data['news']:
@@ -376,29 +491,27 @@ def extract_news_and_events(soup: BeautifulSoup) -> Dict[str, List[Dict[str, Any
                 break
                 
         except Exception as e:
-            logger.debug(f"Failed to extract news with selector {selector}: {e}")
+            logger.debug(f"Failed to extract news from a candidate section: {e}")
             continue
     
     # Extract Events/Announcements
-    for selector in event_selectors:
+    for events_section in EVENT_SECTIONS_SEL.select(soup):
         try:
-            events_section = soup.select_one(selector)
-            if not events_section:
-                continue
-            
             # Try different event item structures
             event_items = (
-                events_section.select('.event-item, .event, .announcement, li, .row') or
-                events_section.select('div[class*="event"], div[class*="announcement"]') or
-                events_section.select('p, div')
+                EVENT_ITEM_SELS[0].select(events_section) or
+                EVENT_ITEM_SELS[1].select(events_section) or
+                EVENT_ITEM_SELS[2].select(events_section)
             )
             
             for item in event_items:
+                if len(seen_titles['events']) >= max_items and len(seen_titles['announcements']) >= max_items:
+                    break
                 event_item = {}
                 
                 # Extract event title/type
                 title_elem = (
-                    item.select_one('.title, .event-title, .announcement-title, h3, h4, h5, strong') or
+                    EVENT_TITLE_SEL.select_one(item) or
                     item
                 )
                 
@@ -406,46 +519,49 @@ def extract_news_and_events(soup: BeautifulSoup) -> Dict[str, List[Dict[str, Any
                     title = title_elem.get_text(strip=True)
                     if len(title) < 5:  # Skip very short titles
                         continue
+                    # Categorize based on keywords
+                    if EVENT_KEYWORDS_RE.search(title):
+                        category = 'events'
+                    else:
+                        category = 'announcements'
+                    if title in seen_titles[category] or len(seen_titles[category]) >= max_items:
+                        continue
                     event_item['title'] = title
                 
                 # Extract date
-                date_elem = item.select_one('.date, .event-date, .announcement-date, time, [data-date]')
+                date_elem = EVENT_DATE_SEL.select_one(item)
                 if date_elem:
                     date_text = date_elem.get_text(strip=True)
                     event_item['date'] = parse_date(date_text)
                 else:
                     # Try to extract date from full text
                     full_text = item.get_text()
-                    date_match = re.search(r'\b\d{1,2}[\s\-/]\w{3,9}[\s\-/]\d{2,4}\b', full_text)
+                    date_match = DATE_INLINE_RE.search(full_text)
                     if date_match:
                         event_item['date'] = parse_date(date_match.group())
                 
                 # Extract event type/category
-                type_elem = item.select_one('.type, .category, .event-type')
+                type_elem = EVENT_TYPE_SEL.select_one(item)
                 if type_elem:
                     event_item['type'] = type_elem.get_text(strip=True)
                 
                 # Extract description
-                desc_elem = item.select_one('.description, .details, p')
+                desc_elem = EVENT_DESC_SEL.select_one(item)
                 if desc_elem and desc_elem != title_elem:
                     description = desc_elem.get_text(strip=True)
                     if description and description != event_item.get('title'):
                         event_item['description'] = description[:300]
                 
                 if event_item and 'title' in event_item:
-                    # Categorize based on keywords
-                    title_lower = event_item['title'].lower()
-                    if any(word in title_lower for word in ['dividend', 'agm', 'egm', 'result', 'earnings', 'meeting']):
-                        news_data['events'].append(event_item)
-                    else:
-                        news_data['announcements'].append(event_item)
+                    seen_titles[category].add(event_item['title'])
+                    news_data[category].append(event_item)
             
             if news_data['events'] or news_data['announcements']:
                 logger.info(f"Extracted {len(news_data['events'])} events and {len(news_data['announcements'])} announcements")
                 break
                 
         except Exception as e:
-            logger.debug(f"Failed to extract events with selector {selector}: {e}")
+            logger.debug(f"Failed to extract events from a candidate section: {e}")
             continue
     
     # Try to extract from general content areas if specific sections not found
@@ -458,31 +574,25 @@ def extract_news_and_events(soup: BeautifulSoup) -> Dict[str, List[Dict[str, Any
                 # Look for date patterns followed by text
                 text_blocks = area.select('p, div, li')
                 for block in text_blocks:
+                    if len(seen_titles['announcements']) >= max_items:
+                        break
                     text = block.get_text(strip=True)
-                    if len(text) > 20 and re.search(r'\b\d{1,2}[\s\-/]\w{3,9}[\s\-/]\d{2,4}\b', text):
+                    date_match = DATE_INLINE_RE.search(text) if len(text) > 20 else None
+                    if date_match:
                         # This looks like it might be a news item or event
-                        date_match = re.search(r'\b\d{1,2}[\s\-/]\w{3,9}[\s\-/]\d{2,4}\b', text)
-                        item = {
-                            'title': text[:100] + ('...' if len(text) > 100 else ''),
-                            'date': parse_date(date_match.group()) if date_match else None,
+                        title = text[:100] + ('...' if len(text) > 100 else '')
+                        if title in seen_titles['announcements']:
+                            continue
+                        seen_titles['announcements'].add(title)
+                        news_data['announcements'].append({
+                            'title': title,
+                            'date': parse_date(date_match.group()),
                             'description': text[:400] + ('...' if len(text) > 400 else '')
-                        }
-                        news_data['announcements'].append(item)
+                        })
             
         except Exception as e:
             logger.debug(f"Failed to extract from general content: {e}")
     
-    # Remove duplicates and limit results
-    for category in news_data:
-        seen_titles = set()
-        unique_items = []
-        for item in news_data[category][:20]:  # Limit to 20 items per category
-            title = item.get('title', '')
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                unique_items.append(item)
-        news_data[category] = unique_items
-    
     return news_data
 
 def validate_data(data: Dict[str, Any], ticker: str) -> bool:
@@ -521,26 +631,24 @@ def _parse_table(table: BeautifulSoup) -> Dict[str, Any]:
         return data
 
     # Extract headers (often in the first row)
-    headers = [th.get_text(strip=True) for th in table.find('thead').find_all('th')]
+    # Header names are interned since they repeat across tables and tickers
+    headers = [sys.intern(th.get_text(strip=True)) for th in table.find('thead').find_all('th')]
     if not headers:
-        headers = [th.get_text(strip=True) for th in table.find('tr').find_all('th')]
+        headers = [sys.intern(th.get_text(strip=True)) for th in table.find('tr').find_all('th')]
     
-    # Extract data rows
-    rows = table.find('tbody').find_all('tr')
+    # Extract data rows (direct children only, so cell lookup never descends into cell markup)
+    rows = table.find('tbody').find_all('tr', recursive=False)
     
     for row in rows:
-        cols = row.find_all(['td', 'th'])
+        cells = [col.get_text(strip=True) for col in row.find_all(['td', 'th'], recursive=False)]
         # The first column is the row's metric/name
-        row_name = cols[0].get_text(strip=True)
-        row_values = [col.get_text(strip=True) for col in cols[1:]]
+        row_name = sys.intern(cells[0])
         
-        # Create a dictionary for the row, mapping headers to values
-        row_data = {}
-        # Ensure header count matches value count
-        for i, header in enumerate(headers[1:]):
-            if i < len(row_values):
-                row_data[header] = clean_financial_value(row_values[i])
-        data[row_name] = row_data
+        # Map headers to values; zip stops at the shorter of the two
+        data[row_name] = {
+            header: clean_financial_value(value)
+            for header, value in zip(headers[1:], cells[1:])
+        }
         
     return data
 
@@ -555,19 +663,37 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
         f"https://www.screener.in/company/{ticker.upper()}/"
     ]
     
+    # Try the URL that worked last time first
+    cached_url = _url_cache.get(ticker)
+    if cached_url:
+        url_patterns = [cached_url] + [u for u in url_patterns if u != cached_url]
+    
     for url in url_patterns:
         try:
             logger.info(f"Attempting to fetch data from: {url}")
-            response = session.get(url, headers=HEADERS, timeout=30)
+            _throttle()
+            # Stream so the body is only downloaded once status and headers look right
+            response = session.get(url, timeout=REQUEST_TIMEOUT, stream=True)
+            content_type = response.headers.get('Content-Type', '')
+            content_length = int(response.headers.get('Content-Length') or 0)
             
-            if response.status_code == 200:
-                break
-            elif response.status_code == 404:
-                logger.warning(f"Page not found for {ticker} at {url}")
+            if response.status_code == 200 and 'html' in content_type and content_length <= MAX_PAGE_BYTES:
+                # Read the body now so read errors are handled here
+                page = _read_capped(response)
+                if page is not None:
+                    _remember_url(ticker, url)
+                    break
+                logger.warning(f"Page for {ticker} at {url} exceeds {MAX_PAGE_BYTES} bytes")
                 continue
-            else:
+            
+            response.close()
+            if response.status_code == 404:
+                logger.warning(f"Page not found for {ticker} at {url}")
+            elif response.status_code != 200:
                 logger.warning(f"HTTP {response.status_code} for {ticker} at {url}")
-                continue
+            else:
+                logger.warning(f"Unexpected response for {ticker} at {url}: {content_type or 'no content type'}, {content_length} bytes")
+            continue
                 
         except requests.exceptions.RequestException as e:
             logger.error(f"Request failed for {ticker} at {url}: {e}")
@@ -577,9 +703,19 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
         return {}
     
     try:
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(page, HTML_PARSER)
         data = {}
         
+        # Index section headings and id'd elements in one walk (first occurrence wins, like soup.find)
+        h2_index = {}
+        sections_by_id = {}
+        for element in soup.find_all(True):
+            if element.name == 'h2':
+                h2_index.setdefault(element.get_text(strip=True), element)
+            element_id = element.get('id')
+            if element_id:
+                sections_by_id.setdefault(element_id, element)
+        
         # Extract company name
         data['company_name'] = extract_company_name(soup, ticker)
         logger.info(f"Extracted company name: {data['company_name']}")
@@ -589,15 +725,15 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
         logger.info(f"Extracted {len(data.get('ratios', {}))} financial ratios")
         
         # Extract profit & loss data
-        data['profit_loss'] = extract_financial_table(soup, 'stand-alone-profit-loss')
+        data['profit_loss'] = extract_financial_table(soup, 'stand-alone-profit-loss', sections_by_id)
         
         # If no standalone data, try consolidated
         if not data['profit_loss']:
-            data['profit_loss'] = extract_financial_table(soup, 'consolidated-profit-loss')
+            data['profit_loss'] = extract_financial_table(soup, 'consolidated-profit-loss', sections_by_id)
         
         # Try generic profit-loss if still empty
         if not data['profit_loss']:
-            data['profit_loss'] = extract_financial_table(soup, 'profit-loss')
+            data['profit_loss'] = extract_financial_table(soup, 'profit-loss', sections_by_id)
         
         logger.info(f"Extracted {len(data.get('profit_loss', {}))} P&L line items")
         
@@ -605,7 +741,7 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
 
         # Extract Peer Comparison Table
         try:
-            peer_table_header = soup.find('h2', string='Peer comparison')
+            peer_table_header = h2_index.get('Peer comparison')
             if peer_table_header:
                 peer_table = peer_table_header.find_next('table')
                 if peer_table:
@@ -616,7 +752,7 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
 
         # Extract Balance Sheet
         try:
-            balance_sheet_header = soup.find('h2', string='Balance Sheet')
+            balance_sheet_header = h2_index.get('Balance Sheet')
             if balance_sheet_header:
                 balance_sheet_table = balance_sheet_header.find_next('table')
                 if balance_sheet_table:
@@ -627,7 +763,7 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
 
         # Extract Cash Flows
         try:
-            cash_flow_header = soup.find('h2', string='Cash Flows')
+            cash_flow_header = h2_index.get('Cash Flows')
             if cash_flow_header:
                 cash_flow_table = cash_flow_header.find_next('table')
                 if cash_flow_table:
@@ -638,7 +774,7 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
 
         # Extract Ratios
         try:
-            ratios_table_header = soup.find('h2', string='Ratios')
+            ratios_table_header = h2_index.get('Ratios')
             if ratios_table_header:
                 ratios_table = ratios_table_header.find_next('table')
                 if ratios_table:
@@ -649,7 +785,7 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
 
         # Extract Shareholding Pattern
         try:
-            shareholding_header = soup.find('h2', string='Shareholding Pattern')
+            shareholding_header = h2_index.get('Shareholding Pattern')
             if shareholding_header:
                 shareholding_table = shareholding_header.find_next('table')
                 if shareholding_table:
@@ -680,55 +816,96 @@ def get_company_data(ticker: str) -> Dict[str, Any]:
         logger.error(f"Error parsing data for {ticker}: {e}")
         return {}
 
-def scrape_and_save_data(tickers: List[str]):
-    """Scrapes data for a list of tickers and saves it to JSON files."""
-    
-    if not tickers:
-        logger.warning("No tickers provided for scraping")
-        return
-    
-    successful_scrapes = 0
-    failed_scrapes = 0
+# Number of timestamped backups kept per ticker
+MAX_BACKUPS = 3
+
+def _content_hash(data: Dict[str, Any]) -> str:
+    """Hash of the scraped payload, ignoring _metadata (which changes on every run)."""
+    payload = {key: value for key, value in data.items() if key != '_metadata'}
+    serialized = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.blake2b(serialized, digest_size=16).hexdigest()
+
+def _stored_content_hash(file_path: str) -> Optional[str]:
+    """Content hash recorded in an existing JSON file, if any."""
+    try:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read()).get('_metadata', {}).get('content_hash')
+    except (OSError, orjson.JSONDecodeError, AttributeError):
+        return None
+
+def _backup_and_prune(ticker: str, file_path: str):
+    """Keep a timestamped copy of the current file and drop all but the newest MAX_BACKUPS."""
+    backup_path = f"scraped_data/{ticker}_backup_{int(time.time())}.json"
+    try:
+        os.link(file_path, backup_path)  # No data copy; the live file is replaced atomically next
+    except OSError:
+        shutil.copy2(file_path, backup_path)
+    logger.info(f"Created backup: {backup_path}")
+    
+    backups = sorted(
+        glob.glob(f"scraped_data/{glob.escape(ticker)}_backup_*.json"),
+        key=lambda path: int(path.rsplit('_', 1)[-1].removesuffix('.json'))
+    )
+    for old_backup in backups[:-MAX_BACKUPS]:
+        os.remove(old_backup)
+
+def _scrape_one(ticker: str, position: str) -> bool:
+    """Scrapes and saves a single ticker. Returns True on success."""
+    logger.info(f"Scraping data for {ticker} ({position})...")
     
-    for i, ticker in enumerate(tickers, 1):
-        logger.info(f"Scraping data for {ticker} ({i}/{len(tickers)})...")
+    try:
+        data = get_company_data(ticker)
         
-        try:
-            data = get_company_data(ticker)
+        if data and validate_data(data, ticker):
+            file_path = f"scraped_data/{ticker}.json"
+            content_hash = _content_hash(data)
+            data['_metadata']['content_hash'] = content_hash
             
-            if data and validate_data(data, ticker):
-                file_path = f"scraped_data/{ticker}.json"
-                
-                # Create backup if file exists
-                if os.path.exists(file_path):
-                    backup_path = f"scraped_data/{ticker}_backup_{int(time.time())}.json"
-                    os.rename(file_path, backup_path)
-                    logger.info(f"Created backup: {backup_path}")
-                
-                # Save new data
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False, default=str)
-                
-                logger.info(f"Successfully saved data to {file_path}")
-                successful_scrapes += 1
-            else:
-                logger.error(f"Failed to scrape or validate data for {ticker}")
-                failed_scrapes += 1
-                
-        except Exception as e:
-            logger.error(f"Unexpected error scraping {ticker}: {e}")
-            failed_scrapes += 1
+            if os.path.exists(file_path):
+                # Nothing changed since the last scrape: skip the backup and the write
+                if _stored_content_hash(file_path) == content_hash:
+                    logger.info(f"Data for {ticker} unchanged, keeping {file_path}")
+                    return True
+                _backup_and_prune(ticker, file_path)
+            
+            # Save new data via a temp file so readers never see a partial write
+            tmp_path = file_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str))
+            os.replace(tmp_path, file_path)
+            
+            logger.info(f"Successfully saved data to {file_path}")
+            return True
         
-        # Rate limiting with progressive delay
-        if i < len(tickers):  # Don't sleep after last ticker
-            delay = min(2 + (failed_scrapes * 0.5), 10)  # Increase delay if having failures
-            logger.info(f"Waiting {delay:.1f} seconds before next request...")
-            time.sleep(delay)
+        logger.error(f"Failed to scrape or validate data for {ticker}")
+        return False
+            
+    except Exception as e:
+        logger.error(f"Unexpected error scraping {ticker}: {e}")
+        return False
+
+def scrape_and_save_data(tickers: List[str]) -> int:
+    """
+    Scrapes data for a list of tickers concurrently and saves it to JSON files.
+    Returns the number of tickers scraped successfully.
+    """
+    
+    if not tickers:
+        logger.warning("No tickers provided for scraping")
+        return 0
+    
+    # Duplicates would race on the same temp and backup files
+    tickers = list(dict.fromkeys(tickers))
+    positions = [f"{i}/{len(tickers)}" for i in range(1, len(tickers) + 1)]
+    with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_SCRAPES, len(tickers))) as executor:
+        results = list(executor.map(_scrape_one, tickers, positions))
     
+    successful_scrapes = sum(results)
+    failed_scrapes = len(results) - successful_scrapes
     logger.info(f"Scraping completed. Successful: {successful_scrapes}, Failed: {failed_scrapes}")
+    return successful_scrapes
 
 # Example usage:
 if __name__ == '__main__':
-    # Add the tickers you want to scrape here
-    TICKERS_TO_SCRAPE = ["RELIANCE"]
-    scrape_and_save_data(TICKERS_TO_SCRAPE)
\ No newline at end of file
+    # Add the tickers you want to scrape to DEFAULT_TICKERS
+    scrape_and_save_data(DEFAULT_TICKERS)
\ No newline at end of file
@@ -1,51 +1,40 @@
 # chat_history.py
-import sqlite3
-from config import DB_PATH
+import streamlit as st
+from db.database import get_connection, write_lock
 
 def init_chat_history():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS chat_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        query TEXT,
-        response TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    conn.commit()
-    conn.close()
+    with write_lock, get_connection() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            query TEXT,
+            response TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
 
 def save_chat(query, response):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO chat_history (query, response) VALUES (?, ?)", (query, response))
-    conn.commit()
-    conn.close()
+    save_chats([(query, response)])
 
+def save_chats(rows):
+    """Insert many (query, response) pairs in a single transaction."""
+    with write_lock, get_connection() as conn:
+        conn.executemany("INSERT INTO chat_history (query, response) VALUES (?, ?)", rows)
+    get_chat_history.clear()
+
+@st.cache_data
 def get_chat_history():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # make sure table exists
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS chat_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        query TEXT,
-        response TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    conn.commit()
+    """Cached across reruns; save_chats/delete_chat clear it after writing."""
+    rows = get_connection().execute("SELECT id, query FROM chat_history ORDER BY id ASC")
+    return [{"id": row[0], "query": row[1]} for row in rows]
 
-    c.execute("SELECT id, query, response FROM chat_history ORDER BY id ASC")
-    history = [{"id": row[0], "query": row[1], "response": row[2]} for row in c.fetchall()]
-    conn.close()
-    return history
+def get_chat_response(chat_id):
+    """Fetch the full response text for a single chat entry."""
+    row = get_connection().execute("SELECT response FROM chat_history WHERE id=?", (chat_id,)).fetchone()
+    return row[0] if row else None
 
 def delete_chat(chat_id):
     """Delete a chat entry by its id"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM chat_history WHERE id=?", (chat_id,))
-    conn.commit()
-    conn.close()
+    with write_lock, get_connection() as conn:
+        conn.execute("DELETE FROM chat_history WHERE id=?", (chat_id,))
+    get_chat_history.clear()
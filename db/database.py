@@ -1,30 +1,59 @@
 import sqlite3
+import threading
+import streamlit as st
 from config import DB_PATH
 
+# Streamlit may run callbacks from several script threads; serialize writes
+write_lock = threading.Lock()
+
+@st.cache_resource
+def get_connection():
+    """
+    Shared connection to DB_PATH, opened once per process.
+    WAL + synchronous=NORMAL turns each commit into a sequential append
+    instead of a full fsync.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    with write_lock, get_connection() as conn:
+        c = conn.cursor()
 
-    # Trades table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS trades (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        stock TEXT,
-        action TEXT,
-        quantity INTEGER,
-        price REAL,
-        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
+        # Trades table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stock TEXT,
+            action TEXT,
+            quantity INTEGER,
+            price REAL,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        # Trade history only grows; keep per-stock and date-range lookups off full scans
+        c.execute("CREATE INDEX IF NOT EXISTS idx_trades_stock ON trades(stock)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_trades_date ON trades(date)")
 
-    # Holdings table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS holdings (
-        stock TEXT PRIMARY KEY,
-        quantity INTEGER,
-        avg_price REAL
-    )
-    """)
+        # Holdings table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS holdings (
+            stock TEXT PRIMARY KEY,
+            quantity INTEGER,
+            avg_price REAL
+        )
+        """)
 
-    conn.commit()
-    conn.close()
+        # Closing prices already fetched from yfinance, keyed by the requested date
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS price_history (
+            stock TEXT,
+            date TEXT,
+            close REAL,
+            PRIMARY KEY (stock, date)
+        )
+        """)
@@ -1,162 +1,154 @@
 # portfolio_manager.py
-import sqlite3
-import yfinance as yf
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from config import DB_PATH, DEFAULT_QUANTITY
+from config import DEFAULT_QUANTITY
+from db.database import get_connection, write_lock
+from data.data_fetcher import get_ticker, get_info
 
 def buy_stock(ticker, price, qty=DEFAULT_QUANTITY):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    # Create holdings table if not exists
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS holdings (
-            stock TEXT PRIMARY KEY,
-            quantity INTEGER,
-            avg_price REAL
-        )
-    """)
-
-    # Update or insert holding
-    cur.execute("SELECT quantity, avg_price FROM holdings WHERE stock=?", (ticker,))
-    row = cur.fetchone()
-    if row:
-        old_qty, old_avg = row
-        new_qty = old_qty + qty
-        new_avg = (old_qty * old_avg + qty * price) / new_qty
-        cur.execute("UPDATE holdings SET quantity=?, avg_price=? WHERE stock=?", (new_qty, new_avg, ticker))
-    else:
-        cur.execute("INSERT INTO holdings (stock, quantity, avg_price) VALUES (?, ?, ?)", (ticker, qty, price))
-
-    # Create trades table if not exists
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            stock TEXT,
-            action TEXT,
-            price REAL,
-            quantity INTEGER,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Log trade
-    cur.execute("INSERT INTO trades (stock, action, price, quantity) VALUES (?, ?, ?, ?)",
-                (ticker, "BUY", price, qty))
-
-    conn.commit()
-    conn.close()
+    buy_stocks_batch([(ticker, price, qty)])
+
+
+def buy_stocks_batch(items):
+    """
+    Record several buys, given as (ticker, price, qty) tuples, in a single transaction.
+    Tables are created by init_db().
+    """
+    with write_lock, get_connection() as conn:
+        cur = conn.cursor()
+
+        # Insert the holding, or fold the buy into its running average (SQLite >= 3.24 UPSERT)
+        cur.executemany("""
+            INSERT INTO holdings (stock, avg_price, quantity) VALUES (?, ?, ?)
+            ON CONFLICT(stock) DO UPDATE SET
+                avg_price = (holdings.quantity * holdings.avg_price + excluded.quantity * excluded.avg_price)
+                            / (holdings.quantity + excluded.quantity),
+                quantity = holdings.quantity + excluded.quantity
+        """, items)
+
+        # Log trades
+        cur.executemany("INSERT INTO trades (stock, action, price, quantity) VALUES (?, 'BUY', ?, ?)", items)
 
 
 def sell_stock(ticker, price, qty=DEFAULT_QUANTITY):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS holdings (
-            stock TEXT PRIMARY KEY,
-            quantity INTEGER,
-            avg_price REAL
-        )
-    """)
-
-    cur.execute("SELECT quantity, avg_price FROM holdings WHERE stock=?", (ticker,))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        raise RuntimeError(f"⚠️ No holdings found for {ticker}")
-
-    old_qty, old_avg = row
-    if qty > old_qty:
-        qty = old_qty
-
-    new_qty = old_qty - qty
-    if new_qty <= 0:
-        cur.execute("DELETE FROM holdings WHERE stock=?", (ticker,))
-    else:
-        cur.execute("UPDATE holdings SET quantity=?, avg_price=? WHERE stock=?", (new_qty, old_avg, ticker))
-
-    # Create trades table if not exists
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS trades (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            stock TEXT,
-            action TEXT,
-            price REAL,
-            quantity INTEGER,
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Log trade
-    cur.execute("INSERT INTO trades (stock, action, price, quantity) VALUES (?, ?, ?, ?)",
-                (ticker, "SELL", price, qty))
-
-    conn.commit()
-    conn.close()
-
-
-def portfolio_status():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS holdings (
-            stock TEXT PRIMARY KEY,
-            quantity INTEGER,
-            avg_price REAL
-        )
-    """)
-
-    cur.execute("SELECT stock, quantity, avg_price FROM holdings")
-    holdings = cur.fetchall()
-
-    status = []
-    for stock, qty, avg in holdings:
-        try:
-            live_price = yf.Ticker(stock).info.get("regularMarketPrice", None)
-        except Exception:
-            live_price = None
-        unrealized = (live_price - avg) * qty if live_price else None
-        status.append((stock, qty, avg, live_price, unrealized))
-
-    conn.close()
-    return status
+    with write_lock, get_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute("SELECT quantity, avg_price FROM holdings WHERE stock=?", (ticker,))
+        row = cur.fetchone()
+        if not row:
+            raise RuntimeError(f"⚠️ No holdings found for {ticker}")
+
+        old_qty, old_avg = row
+        if qty > old_qty:
+            qty = old_qty
+
+        new_qty = old_qty - qty
+        if new_qty <= 0:
+            cur.execute("DELETE FROM holdings WHERE stock=?", (ticker,))
+        else:
+            cur.execute("UPDATE holdings SET quantity=?, avg_price=? WHERE stock=?", (new_qty, old_avg, ticker))
+
+        # Log trade
+        cur.execute("INSERT INTO trades (stock, action, price, quantity) VALUES (?, ?, ?, ?)",
+                    (ticker, "SELL", price, qty))
+
+
+def _get_holdings():
+    return get_connection().execute("SELECT stock, quantity, avg_price FROM holdings").fetchall()
+
+
+def portfolio_status_bulk():
+    """
+    Portfolio status as a DataFrame. Live prices for all holdings are fetched
+    concurrently and P&L is computed column-wise.
+    """
+    holdings = _get_holdings()
+    stocks = [row[0] for row in holdings]
+    prices = get_live_prices(stocks)
+
+    df = pd.DataFrame({
+        "Stock": stocks,
+        "Quantity": [row[1] for row in holdings],
+        "Avg Buy Price": [row[2] for row in holdings],
+        "Live Price": pd.Series([prices[s] for s in stocks], dtype=float),
+    })
+    df["Unrealized P&L"] = (df["Live Price"] - df["Avg Buy Price"]) * df["Quantity"]
+    return df
 
 
 def get_live_price(ticker):
+    stock = get_ticker(ticker)
+    try:
+        # fast_info only pulls the quote fields instead of the full quoteSummary payload
+        return stock.fast_info["last_price"]
+    except KeyError:
+        pass
+    except Exception:
+        return None
     try:
-        return yf.Ticker(ticker).info.get("regularMarketPrice", None)
+        return get_info(ticker).get("regularMarketPrice", None)
     except Exception:
         return None
 
+@st.cache_data(ttl=60)
+def live_price(ticker):
+    """get_live_price with a 60s cache, so reruns don't re-hit Yahoo for the same ticker."""
+    return get_live_price(ticker)
+
+def get_live_prices(tickers):
+    """Fetch cached live prices for several tickers concurrently. Returns {ticker: price}."""
+    if not tickers:
+        return {}
+    # Workers share the caller's script context, so the cached live_price calls
+    # don't log "missing ScriptRunContext"
+    ctx = get_script_run_ctx(suppress_warning=True)
+    with ThreadPoolExecutor(max_workers=min(8, len(tickers)), initializer=add_script_run_ctx, initargs=(None, ctx)) as executor:
+        return dict(zip(tickers, executor.map(live_price, tickers)))
+
 def get_historical_price(ticker, days_ago):
     """
     Fetches the historical closing price for a stock on a date in the past.
+    Closes for past dates never change, so once fetched they are served from price_history.
     """
     try:
         end_date = datetime.now().date()
+        target_date = end_date - timedelta(days=days_ago)
+
+        row = get_connection().execute(
+            "SELECT close FROM price_history WHERE stock=? AND date=?", (ticker, str(target_date))
+        ).fetchone()
+        if row:
+            return row[0]
+
         start_date = end_date - timedelta(days=days_ago + 10)  # Add a buffer
         
-        stock_data = yf.Ticker(ticker).history(start=start_date, end=end_date)
-        
-        target_date = end_date - timedelta(days=days_ago)
+        stock_data = get_ticker(ticker).history(start=start_date, end=end_date)
         
         if stock_data.empty:
             return None
             
         # Get the closest available price to the target date
-        return stock_data.loc[stock_data.index <= str(target_date)].iloc[-1]["Close"]
+        close = float(stock_data.loc[stock_data.index <= str(target_date)].iloc[-1]["Close"])
+
+        # Today's bar is not final yet; only settled days are stored
+        if days_ago > 0:
+            with write_lock, get_connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO price_history (stock, date, close) VALUES (?, ?, ?)",
+                    (ticker, str(target_date), close)
+                )
+        return close
 
     except Exception as e:
         print(f"DEBUG: Error fetching historical price for {ticker}: {e}")
         return None
 
 def reset_portfolio():
-    """Delete all holdings and trades."""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("DROP TABLE IF EXISTS holdings")
-    cur.execute("DROP TABLE IF EXISTS trades")
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    """Delete all holdings and trades. The (empty) tables are kept."""
+    with write_lock, get_connection() as conn:
+        conn.execute("DELETE FROM holdings")
+        conn.execute("DELETE FROM trades")
\ No newline at end of file